@@ -0,0 +1,13 @@
+# code/blas_threads.py
+# One BLAS thread per process for scripts that fan their fits out to worker
+# processes. BLAS reads these variables when numpy is first imported, so call
+# pin_blas_threads() before anything imports numpy; forked workers inherit it.
+
+import os
+
+BLAS_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+def pin_blas_threads() -> None:
+    # setdefault: a value already exported by the user wins
+    for var in BLAS_VARS:
+        os.environ.setdefault(var, "1")
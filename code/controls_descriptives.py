@@ -6,35 +6,13 @@
 from __future__ import annotations
 from pathlib import Path
 import sys
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
+from data_io import load_cached, save_png
+from summary_stats import availability, describe_frame
 
 CSV_DEFAULT = "Final Data Including Controls.csv"
 CONTROLS = ["Employees", "Debt", "Assets", "Year"]
 
-def read_any(path: Path) -> pd.DataFrame:
-    for enc in ("cp1252", "utf-8-sig", "latin1"):
-        try:
-            return pd.read_csv(path, encoding=enc)
-        except Exception:
-            pass
-    raise RuntimeError(f"Failed to read CSV at: {path}")
-
-def describe(s: pd.Series, total_n: int) -> dict:
-    x = s.dropna()
-    return {
-        "n": int(x.size),
-        "coverage_pct": x.size / total_n * 100.0,
-        "mean": float(x.mean()),
-        "std": float(x.std(ddof=1)),
-        "min": float(x.min()),
-        "q1": float(x.quantile(0.25)),
-        "median": float(x.median()),
-        "q3": float(x.quantile(0.75)),
-        "max": float(x.max()),
-    }
-
 def ensure_dir(p: Path) -> Path:
     p.mkdir(parents=True, exist_ok=True)
     return p
@@ -48,55 +26,41 @@ def main():
         print(f"[HINT] Put '{CSV_DEFAULT}' in {default_csv.parent} or pass a full path.")
         sys.exit(1)
 
-    df = read_any(csv_path)
+    df = load_cached(csv_path, columns=CONTROLS)
     total = len(df)
 
     out_tables = ensure_dir(project_root / "outputs" / "tables")
     out_figs   = ensure_dir(project_root / "outputs" / "figures")
 
     # 1) Availability
-    avail = df[CONTROLS].notna().sum()
-    availability = pd.DataFrame({
-        "variable": avail.index,
-        "non_null": avail.values,
-        "missing": total - avail.values,
-        "pct_available": (avail.values / total * 100.0),
-    }).round(2)
-    availability.to_csv(out_tables / "controls_availability.csv", index=False)
+    availability(df, CONTROLS, total).to_csv(out_tables / "controls_availability.csv", index=False, float_format="%.2f")
 
     # 2) Descriptives for Employees, Debt, Assets, Year
-    rows = []
-    for col in CONTROLS:
-        rows.append({"variable": col, **describe(df[col], total)})
-    desc = pd.DataFrame(rows).round(2)
-    desc.to_csv(out_tables / "controls_descriptives.csv", index=False)
+    desc = describe_frame(df, CONTROLS, total)
+    desc.to_csv(out_tables / "controls_descriptives.csv", index=False, float_format="%.2f")
 
     # 3) Leverage = Debt/Assets when both present and Assets != 0
     mask = df["Debt"].notna() & df["Assets"].notna() & (df["Assets"] != 0)
     leverage = (df.loc[mask, "Debt"] / df.loc[mask, "Assets"]).astype(float)
-    lev_desc = pd.DataFrame([describe(leverage, total)]).round(4)
-    lev_desc.insert(0, "variable", "Leverage(Debt/Assets)")
-    lev_desc.to_csv(out_tables / "leverage_descriptives.csv", index=False)
+    lev_name = "Leverage(Debt/Assets)"
+    lev_desc = describe_frame(leverage.to_frame(lev_name), [lev_name], total)
+    lev_desc.to_csv(out_tables / "leverage_descriptives.csv", index=False, float_format="%.4f")
 
-    # 4) Basic figures (hist + box) for Employees, Debt, Assets, Leverage
+    # 4) Basic figures (hist + box side by side) for Employees, Debt, Assets, Leverage
     for name, s in {
-        "Employees": df["Employees"].dropna(),
-        "Debt": df["Debt"].dropna(),
-        "Assets": df["Assets"].dropna(),
-        "Leverage": leverage.dropna(),
+        "Employees": df["Employees"],
+        "Debt": df["Debt"],
+        "Assets": df["Assets"],
+        "Leverage": leverage,
     }.items():
-        # Histogram
-        plt.figure()
-        plt.hist(s, bins=30)
-        plt.title(f"{name} distribution")
-        plt.xlabel(name); plt.ylabel("Count")
-        plt.tight_layout(); plt.savefig(out_figs / f"{name}_hist.png", dpi=300); plt.close()
-
-        # Boxplot
-        plt.figure()
-        plt.boxplot(s, vert=True, showfliers=True)
-        plt.title(f"{name} boxplot"); plt.ylabel(name)
-        plt.tight_layout(); plt.savefig(out_figs / f"{name}_box.png", dpi=300); plt.close()
+        vals = s.dropna().to_numpy()
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 4))
+        ax1.hist(vals, bins=30)
+        ax1.set_title(f"{name} distribution")
+        ax1.set_xlabel(name); ax1.set_ylabel("Count")
+        ax2.boxplot(vals, vert=True, showfliers=True)
+        ax2.set_title(f"{name} boxplot"); ax2.set_ylabel(name)
+        fig.tight_layout(); save_png(fig, out_figs / f"{name}_hist_box.png", dpi=200); plt.close(fig)
 
     # Console check
     print("[OK] Tables written to:", out_tables)
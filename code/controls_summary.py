@@ -1,6 +1,10 @@
 import pathlib
+import sys
+import numpy as np
 import pandas as pd
 from linearmodels.panel import PanelOLS
+from data_io import load_cached
+from panel_utils import firm_codes, level_nunique, multi_shift
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 DATA = ROOT / "data" / "Final Data Including Controls.csv"
@@ -11,18 +15,16 @@ ENTITY, TIME = "Company_Code", "Year"
 Y_LIST = ["ROA", "NIAT"]
 ESG = "ESG_Score"
 CONTROLS = ["Employees", "Debt"]
+NEED = ["Sector", ENTITY, TIME, ESG, *Y_LIST, *CONTROLS]
+NUMERIC = {c: "float64" for c in [ESG, *Y_LIST, *CONTROLS]}
 
 def prep(df: pd.DataFrame) -> pd.DataFrame:
     # keep only needed cols
-    need = ["Sector", ENTITY, TIME, ESG, *Y_LIST, *CONTROLS]
-    df = df.loc[:, need].copy()
-
-    # coerce numerics safely
-    for c in [ESG, *Y_LIST, *CONTROLS]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df = df.loc[:, NEED].copy()
 
     # normalise keys
     df[ENTITY] = df[ENTITY].astype(str)
+    df["Sector"] = df["Sector"].astype("category")
     df[TIME] = pd.to_numeric(df[TIME], errors="coerce").astype("Int64")
 
     # drop rows without keys
@@ -31,15 +33,15 @@ def prep(df: pd.DataFrame) -> pd.DataFrame:
 
 def valid_panel(df_idxed: pd.DataFrame) -> bool:
     return (
-        df_idxed.index.get_level_values(0).nunique() >= 2
-        and df_idxed.index.get_level_values(1).nunique() >= 2
+        level_nunique(df_idxed.index, 0) >= 2
+        and level_nunique(df_idxed.index, 1) >= 2
         and len(df_idxed) > 10
     )
 
 def try_fit(df_idxed: pd.DataFrame, ycol: str, lag: int, label: str):
     row = {
         "panel": label, "outcome": ycol, "lag": lag,
-        "entities": int(df_idxed.index.get_level_values(0).nunique()),
+        "entities": level_nunique(df_idxed.index),
         "obs_used": int(len(df_idxed)), "clustered_SEs": "entity+year",
         "coef_Employees": float("nan"), "p_Employees": float("nan"),
         "coef_Debt": float("nan"), "p_Debt": float("nan"),
@@ -63,16 +65,23 @@ def try_fit(df_idxed: pd.DataFrame, ycol: str, lag: int, label: str):
 
 def run_block(df_idxed: pd.DataFrame, label: str) -> pd.DataFrame:
     rows = []
-    for lag in [0, 1, 2]:
-        df_lag = df_idxed.copy()
-        df_lag[f"{ESG}_lag{lag}"] = df_lag.groupby(level=0)[ESG].shift(lag)
-        cols = [*Y_LIST, f"{ESG}_lag{lag}", *CONTROLS]
-        df_lag = df_lag[cols].dropna()
+    # shift ESG for all lags in one call; each lag then only selects columns
+    shifts = multi_shift(df_idxed[ESG], firm_codes(df_idxed.index), (0, 1, 2))
+    base = df_idxed[[*Y_LIST, *CONTROLS]].to_numpy(dtype="float64")
+    base_ok = ~np.isnan(base).any(axis=1)
+    for lag, esg_lag in shifts.items():
+        # complete rows from the numpy NaN mask instead of assign + dropna
+        ok = base_ok & ~np.isnan(esg_lag)
+        df_lag = pd.DataFrame(
+            np.column_stack([base[ok], esg_lag[ok]]),
+            index=df_idxed.index[ok],
+            columns=[*Y_LIST, *CONTROLS, f"{ESG}_lag{lag}"],
+        )
         if not valid_panel(df_lag):
             for y in Y_LIST:
                 rows.append({
                     "panel": label, "outcome": y, "lag": lag,
-                    "entities": int(df_lag.index.get_level_values(0).nunique()) if len(df_lag) else 0,
+                    "entities": level_nunique(df_lag.index),
                     "obs_used": int(len(df_lag)),
                     "clustered_SEs": "entity+year",
                     "coef_Employees": float("nan"), "p_Employees": float("nan"),
@@ -84,24 +93,24 @@ def run_block(df_idxed: pd.DataFrame, label: str) -> pd.DataFrame:
             rows.append(try_fit(df_lag, y, lag, label))
     return pd.DataFrame(rows)
 
-def main():
-    df = prep(pd.read_csv(DATA, encoding="ISO-8859-1"))
+def main(csv_path=None):
+    csv_path = pathlib.Path(csv_path) if csv_path else DATA
+    df = prep(load_cached(csv_path, columns=NEED, dtype=NUMERIC))
     # full
     full = run_block(df, "Full sample")
     full.to_csv(OUT / "controls_full.csv", index=False)
 
-    # hotels only
-    hotels_mask = df.reset_index().Sector.str.contains("hotel", case=False, na=False)
-    hotels = df.reset_index().loc[hotels_mask].set_index([ENTITY, TIME])
+    # hotels only (masks on the indexed frame keep the MultiIndex as is)
+    hotels = df[df["Sector"].str.contains("hotel", case=False, na=False, regex=False)]
     run_block(hotels, "Hotels only").to_csv(OUT / "controls_hotels.csv", index=False)
 
     # covid splits
-    idx = df.reset_index()
-    covid = idx[idx[TIME].between(2020, 2021)].set_index([ENTITY, TIME])
-    noncovid = idx[idx[TIME].between(2008, 2019) | idx[TIME].between(2022, 2024)].set_index([ENTITY, TIME])
+    yr = df.index.get_level_values(TIME)
+    covid = df[(yr >= 2020) & (yr <= 2021)]
+    noncovid = df[((yr >= 2008) & (yr <= 2019)) | ((yr >= 2022) & (yr <= 2024))]
     run_block(covid, "COVID 2020–2021").to_csv(OUT / "controls_covid.csv", index=False)
     run_block(noncovid, "Non-COVID 2008–2019 & 2022–2024").to_csv(OUT / "controls_noncovid.csv", index=False)
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
 
@@ -8,9 +8,9 @@
 from __future__ import annotations
 from pathlib import Path
 import sys
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from data_io import load_cached, save_png
 
 CSV_DEFAULT = "Final Data Including Controls.csv"
 VARS = [
@@ -19,14 +19,6 @@ VARS = [
     "Employees", "Assets", "Debt"
 ]
 
-def read_any(path: Path) -> pd.DataFrame:
-    for enc in ("cp1252", "utf-8-sig", "latin1"):
-        try:
-            return pd.read_csv(path, encoding=enc)
-        except Exception:
-            pass
-    raise RuntimeError(f"Failed to read CSV at: {path}")
-
 def main():
     project_root = Path(__file__).resolve().parents[1]
     default_csv = project_root / "data" / CSV_DEFAULT
@@ -36,15 +28,15 @@ def main():
         print(f"[HINT] Put '{CSV_DEFAULT}' in {default_csv.parent} or pass a full path.")
         sys.exit(1)
 
-    df = read_any(csv_path)
+    df = load_cached(csv_path, columns=VARS)
 
     # Pairwise-complete correlations (pandas default)
-    corr = df[VARS].corr().round(2)
+    corr = df[VARS].corr()
 
     # Write table
     out_tables = project_root / "outputs" / "tables"
     out_tables.mkdir(parents=True, exist_ok=True)
-    corr.to_csv(out_tables / "correlation_matrix.csv", index=True)
+    corr.to_csv(out_tables / "correlation_matrix.csv", index=True, float_format="%.2f")
 
     # Heatmap with numeric annotations (matplotlib only)
     out_figs = project_root / "outputs" / "figures"
@@ -56,16 +48,16 @@ def main():
     ax.set_xticklabels(VARS, rotation=90)
     ax.set_yticklabels(VARS)
 
-    # annotate
-    for i in range(len(VARS)):
-        for j in range(len(VARS)):
-            ax.text(j, i, f"{corr.iat[i, j]:.2f}", ha="center", va="center", fontsize=8)
+    # annotate (format all cells in one go, no per-cell pandas lookups)
+    cell_labels = np.char.mod("%.2f", corr.to_numpy())
+    for (i, j), lab in np.ndenumerate(cell_labels):
+        ax.text(j, i, lab, ha="center", va="center", fontsize=8)
 
     cbar = fig.colorbar(im)
     cbar.set_label("Pearson r", rotation=90)
     ax.set_title("Correlation Matrix of Key Variables (pairwise deletion)")
     fig.tight_layout()
-    fig.savefig(out_figs / "correlation_matrix.png", dpi=300)
+    save_png(fig, out_figs / "correlation_matrix.png")
     plt.close(fig)
 
     print("[OK] Wrote:")
@@ -0,0 +1,191 @@
+# code/data_io.py
+# Shared loader for "Final Data Including Controls.csv" and PNG writer.
+# The first read parses the CSV and writes a Parquet copy next to it;
+# later reads use that copy for as long as it is newer than the CSV.
+# load_panel() does the same for the typed, (firm, year)-indexed panel
+# used by the model and diagnostics scripts, and keeps it in memory for
+# the rest of the process.
+
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+import codecs
+import hashlib
+import re
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype, is_numeric_dtype
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # cache is skipped, every call parses the CSV
+    pyarrow = None
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+CSV_NAME = "Final Data Including Controls.csv"
+
+FIRM, YEAR, SECTOR = "Company_Code", "Year", "Sector"
+PANEL_NUMERIC = ["Year", "ESG_Score", "Environmental_Score", "Social_Score", "Governance_Score",
+                 "Employees", "Assets", "Debt", "ROA", "NIAT"]
+
+def project_paths() -> dict[str, Path]:
+    return {
+        "root": PROJECT_ROOT,
+        "csv": PROJECT_ROOT / "data" / CSV_NAME,
+        "outputs": PROJECT_ROOT / "outputs",
+    }
+
+def _decodes_as(path: Path, encoding: str, chunk_size: int) -> bool:
+    # incremental decoder: a multi-byte character split across two chunks
+    # is not an error
+    dec = codecs.getincrementaldecoder(encoding)()
+    try:
+        with open(path, "rb") as fh:
+            while chunk := fh.read(chunk_size):
+                dec.decode(chunk)
+        dec.decode(b"", final=True)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+@lru_cache(maxsize=8)
+def _sniff_encoding(path: Path, mtime: float, chunk_size: int) -> str:
+    with open(path, "rb") as fh:
+        if fh.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+            return "utf-8-sig"
+    if _decodes_as(path, "utf-8", chunk_size):
+        return "utf-8"
+    # Windows-1252 before latin1: it maps 0x80-0x9F to ’ – € … rather than
+    # to C1 control characters; latin1 only for bytes cp1252 leaves undefined
+    if _decodes_as(path, "cp1252", chunk_size):
+        return "cp1252"
+    return "latin1"
+
+def sniff_encoding(path: Path, chunk_size: int = 1 << 20) -> str:
+    # checks the whole file (bytes only, no CSV parse), so the single parse
+    # in read_csv_robust cannot hit a stray byte past some sample window.
+    # Memoised on (path, mtime): read_header followed by load_cached scans
+    # the file once per run, and an edited file is sniffed again.
+    path = Path(path).resolve()
+    return _sniff_encoding(path, path.stat().st_mtime, chunk_size)
+
+def read_csv_robust(path: Path, encoding: str | None = None,
+                    columns: list[str] | None = None) -> pd.DataFrame:
+    enc = encoding or sniff_encoding(path)
+    if pyarrow is not None and codecs.lookup(enc).name in ("utf-8", "utf-8-sig"):
+        # multithreaded Arrow tokenizer, for UTF-8 files only: on other bytes
+        # it does not raise but hands back `bytes` objects. pandas still
+        # applies its NA values and usecols. Arrow parse errors (ValueError)
+        # and any column holding bytes fall through to the C parser.
+        try:
+            df = pd.read_csv(path, encoding=enc, usecols=columns, engine="pyarrow")
+            if not any(infer_dtype(df[c], skipna=True) in ("bytes", "mixed")
+                       for c in df.columns if df[c].dtype == object):
+                return df
+        except ValueError:
+            pass
+    try:
+        return pd.read_csv(path, encoding=enc, usecols=columns, low_memory=False)
+    except UnicodeDecodeError:
+        if encoding is None:
+            raise
+        # only a caller-supplied encoding can be wrong here: use the sniffed one
+        return pd.read_csv(path, encoding=sniff_encoding(path), usecols=columns, low_memory=False)
+
+def cache_path(path: Path) -> Path | None:
+    """Parquet copy of `path` if it exists and is newer than the CSV, else None."""
+    cache = Path(path).with_suffix(".parquet")
+    if pyarrow is not None and cache.exists() and cache.stat().st_mtime > Path(path).stat().st_mtime:
+        return cache
+    return None
+
+def read_header(path: Path) -> list[str]:
+    cache = cache_path(path)
+    if cache is not None:
+        return list(pyarrow.parquet.read_schema(cache).names)
+    return list(pd.read_csv(path, encoding=sniff_encoding(path), nrows=0).columns)
+
+def coerce_numeric(df: pd.DataFrame, dtype: dict[str, str]) -> pd.DataFrame:
+    """Cast the `dtype` columns, turning non-numeric tokens such as "-" into NaN."""
+    # pd.to_numeric(errors="coerce") only for columns not already numeric
+    for c, t in dtype.items():
+        if c in df.columns:
+            col = df[c] if is_numeric_dtype(df[c]) else pd.to_numeric(df[c], errors="coerce")
+            df[c] = col.astype(t, copy=False)
+    return df
+
+def load_cached(path: Path, encoding: str | None = None,
+                columns: list[str] | None = None,
+                dtype: dict[str, str] | None = None) -> pd.DataFrame:
+    path = Path(path)
+    cache = cache_path(path)
+    if cache is not None:
+        df = pd.read_parquet(cache, engine="pyarrow", columns=columns)
+        # Parquet keeps the parsed dtypes, so numeric columns skip the coerce pass
+        return df if dtype is None else coerce_numeric(df, dtype)
+    if pyarrow is None:
+        df = read_csv_robust(path, encoding, columns)
+        return df if dtype is None else coerce_numeric(df, dtype)
+
+    # cache miss: parse every column once so the cache serves all scripts
+    df = read_csv_robust(path, encoding)
+    cache = path.with_suffix(".parquet")
+    try:
+        df.to_parquet(cache, engine="pyarrow", compression="zstd", index=False)
+    except (OSError, ValueError, pyarrow.ArrowException):
+        # read-only data folder or a mixed-type column: just skip the cache
+        cache.unlink(missing_ok=True)
+    if dtype is not None:
+        df = coerce_numeric(df, dtype)
+    return df if columns is None else df[columns]
+
+def build_panel(df: pd.DataFrame) -> pd.DataFrame:
+    for c in PANEL_NUMERIC:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    if "Debt" in df.columns and "Assets" in df.columns:
+        df["Debt_ratio"] = df["Debt"] / df["Assets"]
+    df = df.replace([np.inf, -np.inf], np.nan)
+    # firm and sector as categoricals: groupbys and masks work on int codes,
+    # and the firm index level stays categorical through set_index
+    for c in (FIRM, SECTOR):
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    return df.set_index([FIRM, YEAR]).sort_index()
+
+def panel_cache_path(path: Path) -> Path:
+    # keyed on the resolved source path, not just its name: two CSVs called
+    # the same in different folders must not share one panel cache
+    path = Path(path).resolve()
+    stem = re.sub(r"\W+", "_", path.stem).strip("_").lower()
+    key = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:12]
+    return PROJECT_ROOT / "outputs" / f"_panel_cache_{stem}_{key}.parquet"
+
+@lru_cache(maxsize=1)
+def _load_panel(path: Path, mtime: float) -> pd.DataFrame:
+    cache = panel_cache_path(path)
+    if pyarrow is not None and cache.exists() and cache.stat().st_mtime > path.stat().st_mtime:
+        return pd.read_parquet(cache, engine="pyarrow")
+
+    df = build_panel(load_cached(path))
+    if pyarrow is not None:
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(cache, engine="pyarrow", compression="zstd")
+        except (OSError, ValueError, pyarrow.ArrowException):
+            cache.unlink(missing_ok=True)
+    return df
+
+def load_panel(path: Path) -> pd.DataFrame:
+    """Numeric-coerced panel with Debt_ratio, indexed and sorted by (Company_Code, Year)."""
+    path = Path(path).resolve()
+    # memoised per process on (path, mtime): scripts run back to back via
+    # runpy share one load, and an edited CSV is still picked up. The shallow
+    # copy lets callers add or replace columns without touching the memo.
+    return _load_panel(path, path.stat().st_mtime).copy(deep=False)
+
+def save_png(fig, path: Path, dpi: int = 300) -> None:
+    # zlib level 1 (lossless, ~3x faster to encode than the default level 6)
+    # and no "Software" text chunk in the file
+    fig.savefig(path, dpi=dpi, metadata={"Software": None}, pil_kwargs={"compress_level": 1})
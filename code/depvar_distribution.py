@@ -2,11 +2,16 @@
 import argparse
 from pathlib import Path
 import pandas as pd
-import numpy as np
+from pandas.api.types import is_numeric_dtype
 import matplotlib.pyplot as plt
+from data_io import load_cached, read_header, save_png
+
+def as_numeric(series: pd.Series) -> pd.Series:
+    # numeric columns (the usual case with the typed cache) skip the coercion pass
+    return series if is_numeric_dtype(series) else pd.to_numeric(series, errors="coerce")
 
 def summarise(series: pd.Series) -> dict:
-    s = pd.to_numeric(series, errors="coerce").dropna()
+    s = as_numeric(series).dropna()
     return {
         "n": int(s.size),
         "mean": s.mean(),
@@ -18,29 +23,19 @@ def summarise(series: pd.Series) -> dict:
         "p99": s.quantile(0.99),
     }
 
-def read_csv_robust(path: str, encoding_hint: str | None):
-    tried = [encoding_hint or "utf-8", "utf-8-sig", "latin1", "cp1252"]
-    last_err = None
-    for enc in tried:
-        try:
-            return pd.read_csv(path, encoding=enc)
-        except UnicodeDecodeError as e:
-            last_err = e
-            continue
-    raise last_err
-
-def main():
+def main(argv: list[str] | None = None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--data", required=True)
     ap.add_argument("--var", default="ROA")
     ap.add_argument("--outdir", default="outputs/descriptives")
     ap.add_argument("--bins", type=int, default=50)
     ap.add_argument("--encoding", default=None)  # e.g., latin1
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
-    df = read_csv_robust(args.data, args.encoding)
-    if args.var not in df.columns:
-        raise SystemExit(f"Column '{args.var}' not found. Available: {list(df.columns)[:20]} ...")
+    header = read_header(args.data)
+    if args.var not in header:
+        raise SystemExit(f"Column '{args.var}' not found. Available: {header[:20]} ...")
+    df = load_cached(args.data, args.encoding, columns=[args.var])
 
     stats = summarise(df[args.var])
 
@@ -48,7 +43,7 @@ def main():
     outdir.mkdir(parents=True, exist_ok=True)
     pd.DataFrame([stats], index=[args.var]).to_csv(outdir / f"{args.var.lower()}_summary.csv", float_format="%.6f")
 
-    s = pd.to_numeric(df[args.var], errors="coerce").dropna()
+    s = as_numeric(df[args.var]).dropna()
     lo, hi = stats["p1"], stats["p99"]
     s_clip = s.clip(lower=lo, upper=hi)
 
@@ -61,7 +56,7 @@ def main():
     plt.xlabel(args.var)
     plt.ylabel("Frequency")
     plt.tight_layout()
-    plt.savefig(outdir / f"{args.var.lower()}_hist.png", dpi=300)
+    save_png(plt.gcf(), outdir / f"{args.var.lower()}_hist.png")
     plt.close()
 
 if __name__ == "__main__":
@@ -9,32 +9,13 @@ from __future__ import annotations
 from pathlib import Path
 import sys
 import pandas as pd
+from data_io import load_cached
+from summary_stats import DESC_COLS, availability, describe_frame
 
 CSV_DEFAULT_NAME = "Final Data Including Controls.csv"
 PILLARS = ["Environmental_Score", "Social_Score", "Governance_Score"]
 ESG_COL = "ESG_Score"
 
-def read_csv_any(path: Path) -> pd.DataFrame:
-    for enc in ("cp1252", "utf-8-sig", "latin1"):
-        try:
-            return pd.read_csv(path, encoding=enc)
-        except Exception:
-            continue
-    raise RuntimeError(f"Failed to read CSV with common encodings at: {path}")
-
-def describe_series(s: pd.Series) -> dict:
-    s = s.dropna()
-    return {
-        "n": int(s.size),
-        "mean": float(s.mean()),
-        "std": float(s.std(ddof=1)),
-        "min": float(s.min()),
-        "q1": float(s.quantile(0.25)),
-        "median": float(s.median()),
-        "q3": float(s.quantile(0.75)),
-        "max": float(s.max()),
-    }
-
 def main():
     # Resolve project root from this file: code/ -> project root
     project_root = Path(__file__).resolve().parents[1]
@@ -48,41 +29,29 @@ def main():
               f"or run: python3 code/describe_esg.py \"/full/path/{CSV_DEFAULT_NAME}\"")
         sys.exit(1)
 
-    df = read_csv_any(csv_path)
+    df = load_cached(csv_path, columns=PILLARS + [ESG_COL])
 
     # Outputs dir at project root
     outdir = project_root / "outputs"
     outdir.mkdir(parents=True, exist_ok=True)
 
     # Availability table
-    cols = PILLARS + [ESG_COL]
-    avail = df[cols].notna().sum().rename("non_null")
     total = len(df)
-    availability = pd.DataFrame({
-        "variable": avail.index,
-        "non_null": avail.values,
-        "missing": total - avail.values,
-        "pct_available": (avail.values / total * 100),
-    }).round(2)
-    availability.to_csv(outdir / "variable_availability.csv", index=False)
+    availability(df, PILLARS + [ESG_COL], total).to_csv(outdir / "variable_availability.csv", index=False, float_format="%.2f")
 
     # Combined ESG descriptives
-    esg_desc = describe_series(df[ESG_COL])
+    esg_desc = describe_frame(df, [ESG_COL]).iloc[0]
     esg_summary = {
         "n_total_rows": int(total),
-        "n_with_ESG": esg_desc["n"],
+        "n_with_ESG": int(esg_desc["n"]),
         "n_missing_ESG": int(total - esg_desc["n"]),
-        **{k: v for k, v in esg_desc.items() if k != "n"},
+        **{k: float(esg_desc[k]) for k in DESC_COLS if k != "n"},
     }
-    pd.DataFrame([esg_summary]).round(2).to_csv(outdir / "esg_combined_summary.csv", index=False)
+    pd.DataFrame([esg_summary]).to_csv(outdir / "esg_combined_summary.csv", index=False, float_format="%.2f")
 
     # Pillar descriptives (useful for the next paragraphs)
-    desc_rows = []
-    for col in PILLARS:
-        d = describe_series(df[col])
-        d["variable"] = col
-        desc_rows.append(d)
-    pd.DataFrame(desc_rows).round(2).to_csv(outdir / "pillar_descriptives.csv", index=False)
+    pillar_desc = describe_frame(df, PILLARS)[DESC_COLS + ["variable"]]
+    pillar_desc.to_csv(outdir / "pillar_descriptives.csv", index=False, float_format="%.2f")
 
     # Console output (concise)
     pretty = {k: (round(v, 2) if isinstance(v, float) else v) for k, v in esg_summary.items()}
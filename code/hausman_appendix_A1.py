@@ -1,35 +1,33 @@
 # hausman_appendix_A1.py
 # Produce Appendix A1 Hausman FE vs RE for full hospitality and Hotels-only.
 
+import os
+# one BLAS thread per process, since the FE/RE cells run in parallel
+# worker processes; must run before numpy is imported
+from blas_threads import pin_blas_threads
+pin_blas_threads()
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import numpy as np
 import pandas as pd
 from scipy.stats import chi2
 from linearmodels.panel import PanelOLS, RandomEffects
+from data_io import load_cached, read_header
+from panel_utils import firm_codes, multi_shift
 
 CSV_FILE = Path((Path(__file__).resolve().parents[1] / 'data' / 'Final Data Including Controls.csv'))
 
-# ---------- loaders ----------
-def load_csv_any_encoding(path: Path) -> pd.DataFrame:
-    for enc in ("utf-8-sig", "cp1252", "latin-1"):
-        try:
-            return pd.read_csv(path, encoding=enc)
-        except UnicodeDecodeError:
-            pass
-    for enc in ("utf-8-sig", "cp1252", "latin-1"):
-        try:
-            return pd.read_csv(path, encoding=enc, engine="python")
-        except UnicodeDecodeError:
-            pass
-    raise UnicodeError("Could not decode CSV.")
-
-def resolve_columns(df: pd.DataFrame) -> dict:
-    cols = {c.lower(): c for c in df.columns}
+# ---------- columns ----------
+@lru_cache(maxsize=1)
+def resolve_columns(columns: tuple) -> dict:
+    cols = {c.lower(): c for c in columns}
+    norm = {re.sub(r"[^a-z]", "", k): v for k, v in cols.items()}
     def pick(names):
         for n in names:
             if n.lower() in cols: return cols[n.lower()]
-        norm = {re.sub(r"[^a-z]", "", k): v for k, v in cols.items()}
         for n in names:
             k2 = re.sub(r"[^a-z]", "", n.lower())
             if k2 in norm: return norm[k2]
@@ -55,43 +53,56 @@ def hausman_stat(fe_res, re_res, keep_idx):
     d = (b_fe - b_re).values
     V = (V_fe - V_re).values
     try:
-        Vinv = np.linalg.inv(V)
+        x = np.linalg.solve(V, d)
     except np.linalg.LinAlgError:
-        Vinv = np.linalg.pinv(V)
-    stat = float(d.T @ Vinv @ d)
+        x = np.linalg.pinv(V) @ d
+    stat = float(d @ x)
     df = int(len(keep_idx))
-    pval = float(1 - chi2.cdf(stat, df))
+    pval = float(chi2.sf(stat, df))
     return stat, df, pval
 
-def build_design(df_idx: pd.DataFrame, y_col: str, esg_col: str, emp_col: str, debt_col: str, lag: int):
-    df = df_idx.copy()
-    df["ESG_lag"] = df[esg_col].groupby(level=0).shift(lag)
-    X = df[["ESG_lag", emp_col, debt_col]].copy()
-    y = df[y_col]
-    keep = ~(y.isna() | X.isna().any(axis=1))
-    y, X = y[keep], X[keep]
+def build_design(df_idx: pd.DataFrame, y_col: str, esg_lag: np.ndarray, emp_col: str, debt_col: str):
+    y = df_idx[y_col].to_numpy(dtype=np.float64)
+    X = np.column_stack([esg_lag, df_idx[[emp_col, debt_col]].to_numpy(dtype=np.float64)])
+    keep = ~(np.isnan(y) | np.isnan(X).any(axis=1))
+    idx = df_idx.index[keep]
+    y = pd.Series(y[keep], index=idx, name=y_col)
+    X = pd.DataFrame(np.asfortranarray(X[keep]), index=idx, columns=["ESG_lag", emp_col, debt_col])
     # drop constant columns
     const_cols = [c for c in X.columns if np.isclose(X[c].std(ddof=0), 0.0)]
     if const_cols:
         X = X.drop(columns=const_cols)
     return y, X
 
+def fit_pair(y: pd.Series, X: pd.DataFrame):
+    # FE: entity + time effects; drop absorbed cols automatically
+    fe_res = PanelOLS(y, X, entity_effects=True, time_effects=True, drop_absorbed=True)\
+                .fit(cov_type="unadjusted")
+    # RE: same X (no explicit time dummies)
+    re_res = RandomEffects(y, X).fit(cov_type="unadjusted")
+    keep_idx = list(X.columns)  # compare only ESG_lag, Employees, Debt
+    return hausman_stat(fe_res, re_res, keep_idx)
+
 def run_block(panel: pd.DataFrame, labels: dict, sample_label: str) -> pd.DataFrame:
-    rows = []
+    # panel is sorted by firm/year, so all four ESG lags come from one call
+    esg_lags = multi_shift(panel[labels["esg"]], firm_codes(panel.index), range(0, 4))
+    cells = []
     for out_name, ycol in [("ROA", labels["roa"]), ("NIAT", labels["niat"])]:
         for lag in range(0, 4):
-            y, X = build_design(panel, ycol, labels["esg"], labels["emp"], labels["debt"], lag)
-            if len(y) == 0 or X.shape[1] == 0:
+            y, X = build_design(panel, ycol, esg_lags[lag], labels["emp"], labels["debt"])
+            cells.append((out_name, lag, y, X))
+
+    # the FE/RE pairs are independent: fit them in worker processes
+    with ProcessPoolExecutor(max_workers=min(len(cells), os.cpu_count() or 1)) as pool:
+        futures = [None if len(y) == 0 or X.shape[1] == 0 else pool.submit(fit_pair, y, X)
+                   for _, _, y, X in cells]
+        rows = []
+        for (out_name, lag, _, _), fut in zip(cells, futures):
+            if fut is None:
                 rows.append({"sample": sample_label, "outcome": out_name, "lag": lag,
                              "chi2": np.nan, "df": 0, "p": np.nan, "decision": "NA"})
                 continue
-            # FE: entity + time effects; drop absorbed cols automatically
-            fe_res = PanelOLS(y, X, entity_effects=True, time_effects=True, drop_absorbed=True)\
-                        .fit(cov_type="unadjusted")
-            # RE: same X (no explicit time dummies)
-            re_res = RandomEffects(y, X).fit(cov_type="unadjusted")
-            keep_idx = list(X.columns)  # compare only ESG_lag, Employees, Debt
-            chi2v, df, p = hausman_stat(fe_res, re_res, keep_idx)
+            chi2v, df, p = fut.result()
             rows.append({
                 "sample": sample_label, "outcome": out_name, "lag": lag,
                 "chi2": round(chi2v, 4), "df": df, "p": float(f"{p:.6g}"),
@@ -109,27 +120,37 @@ def print_block(d: pd.DataFrame, title: str):
         print(f"| {r['outcome']} | {int(r['lag'])} | {c} | {int(r['df'])} | {p} | {r['decision']} |")
 
 # ---------- main ----------
-df0 = load_csv_any_encoding(CSV_FILE)
-labels = resolve_columns(df0)
+def main(csv_path=None):
+    csv_path = Path(csv_path) if csv_path else CSV_FILE
+    labels = resolve_columns(tuple(read_header(csv_path)))
+    df0 = load_cached(csv_path, columns=list(dict.fromkeys(labels.values())))
 
-df = df0[[labels[k] for k in ["firm","year","sector","roa","niat","esg","emp","debt"]]]\
-        .dropna(subset=[labels["firm"], labels["year"]]).copy()
-df[labels["year"]] = df[labels["year"]].astype(int)
-df = df.sort_values([labels["firm"], labels["year"]]).set_index([labels["firm"], labels["year"]])
+    df = df0[[labels[k] for k in ["firm","year","sector","roa","niat","esg","emp","debt"]]]\
+            .dropna(subset=[labels["firm"], labels["year"]]).copy()
+    df[labels["year"]] = df[labels["year"]].astype(int)
+    df = df.sort_values([labels["firm"], labels["year"]])
+    # factorize firms once: integer entity keys for every FE/RE fit below
+    df.index = pd.MultiIndex.from_arrays(
+        [pd.factorize(df[labels["firm"]], sort=False)[0], df[labels["year"]].to_numpy()],
+        names=[labels["firm"], labels["year"]],
+    )
+    df = df.drop(columns=[labels["firm"], labels["year"]])
 
-# keep firms with ≥3 years
-ny = df.groupby(level=0).size()
-df = df[df.index.get_level_values(0).isin(ny[ny >= 3].index)].copy()
+    # keep firms with ≥3 years (count rows per integer firm code, then look up per row)
+    codes = df.index.get_level_values(0).to_numpy()
+    df = df[np.bincount(codes)[codes] >= 3]
 
-# samples
-full = df.copy()
-hotels = df[df[labels["sector"]].astype(str).str.contains(r"\bhotel(s)?\b", case=False, na=False)].copy()
+    # samples
+    full = df.copy()
+    hotels = df[df[labels["sector"]].astype(str).str.contains(r"\bhotel(s)?\b", case=False, na=False)].copy()
 
-out = pd.concat([run_block(full, labels, "full"),
-                 run_block(hotels, labels, "hotels")], ignore_index=True)
-out.to_csv("appendix_A1_hausman.csv", index=False)
+    out = pd.concat([run_block(full, labels, "full"),
+                     run_block(hotels, labels, "hotels")], ignore_index=True)
+    out.to_csv("appendix_A1_hausman.csv", index=False)
 
-print_block(out[out["sample"]=="full"], "Appendix A1 — Panel A: Full hospitality sample")
-print_block(out[out["sample"]=="hotels"], "Appendix A1 — Panel B: Hotels-only subsample")
-print(f"\nWrote {Path('appendix_A1_hausman.csv').resolve()}")
+    print_block(out[out["sample"]=="full"], "Appendix A1 — Panel A: Full hospitality sample")
+    print_block(out[out["sample"]=="hotels"], "Appendix A1 — Panel B: Hotels-only subsample")
+    print(f"\nWrote {Path('appendix_A1_hausman.csv').resolve()}")
 
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
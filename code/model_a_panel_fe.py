@@ -2,10 +2,18 @@
 # Uses your columns exactly:
 # Company_Code, Year, ESG_Score, Employees, Assets, Debt, ROA, NIAT, Sector
 
+import os
+# one BLAS thread per process, since the fits below already run in parallel
+# worker processes; must run before numpy is imported
+from blas_threads import pin_blas_threads
+pin_blas_threads()
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 import numpy as np
 from linearmodels.panel import PanelOLS
+from data_io import load_panel
+from panel_utils import add_lags, estimable_rows, int_firm_index, lag_name
 
 DATA_FILES = ["Final Data Including Controls.csv",
               "Final_cleaned_and_filtered_data_April_2025.csv"]
@@ -27,89 +35,80 @@ def find_csv():
             if p.exists(): return p
     raise FileNotFoundError("Data file not found.")
 
-def read_csv_robust(p: Path):
-    last = None
-    for enc in ("utf-8","utf-8-sig","cp1252","latin-1"):
-        try:
-            df = pd.read_csv(p, encoding=enc, low_memory=False)
-            print(f"Loaded '{p.name}' with encoding '{enc}'.")
-            return df
-        except Exception as e:
-            last = e
-    raise RuntimeError(f"Failed to read CSV. Last error: {last}")
-
-def num(df, cols):
-    for c in cols: df[c] = pd.to_numeric(df[c], errors="coerce")
-
-def build_debt_ratio(df):
-    num(df, [DEBT, ASSETS])
-    df[DEBT_RATIO] = df[DEBT] / df[ASSETS]
-    df.replace([np.inf, -np.inf], np.nan, inplace=True)
-
-def drop_singletons(frame):
-    ent = frame.index.get_level_values(0)
-    keep = ent.value_counts(); keep = keep[keep >= 2].index
-    return frame.loc[ent.isin(keep)]
-
-def fit_one(block, outcome, lag, label):
-    X = block[[ESG, EMPL, DEBT_RATIO]].copy()
-    y = block[outcome].copy()
-    if lag: X[ESG] = X.groupby(level=0)[ESG].shift(lag)
-    data = pd.concat([y, X], axis=1).dropna()
-    data = drop_singletons(data)
-    if data.empty or data.index.get_level_values(0).value_counts().min() < 2:
-        return {"Subset": label,"Outcome": outcome,"Lag": lag,
-                "N (obs)": 0,"R2_within": np.nan,"coef_ESG": np.nan,
-                "p_ESG": np.nan,"status":"no_estimable_panel"}
+def fit_one(index, values, outcome):
+    # returns (N, R2_within, coef_ESG, p_ESG, status)
+    # values: float64 columns [outcome, ESG at this lag, EMPL, DEBT_RATIO]
+    # taken from the subset matrix; complete cases of firms with >= 2 of them
+    keep = estimable_rows(index, values)
+    data = pd.DataFrame(values[keep], index=index[keep], columns=[outcome, ESG, EMPL, DEBT_RATIO])
+    if data.empty:
+        return 0, np.nan, np.nan, np.nan, "no_estimable_panel"
     mod = PanelOLS(data[outcome], data[[ESG, EMPL, DEBT_RATIO]],
                    entity_effects=True, time_effects=True)
-    clusters = pd.Series(data.index.get_level_values(0), index=data.index, name="entity")
+    # firm clusters as the index's integer firm codes (no label re-factorizing)
+    clusters = pd.Series(data.index.codes[0], index=data.index, name="entity")
     res = mod.fit(cov_type="clustered", clusters=clusters)
-    return {"Subset": label,"Outcome": outcome,"Lag": lag,
-            "N (obs)": int(res.nobs),
-            "R2_within": float(res.rsquared_within),
-            "coef_ESG": float(res.params[ESG]),
-            "p_ESG": float(res.pvalues[ESG]),
-            "status":"ok"}
+    return (int(res.nobs), float(res.rsquared_within),
+            float(res.params[ESG]), float(res.pvalues[ESG]), "ok")
 
-if __name__ == "__main__":
+def main():
     path = find_csv()
-    df = read_csv_robust(path)
-    required = [FIRM, YEAR, ESG, EMPL, ASSETS, DEBT, SECTOR, *OUTCOMES]
+    # typed (firm, year) panel with Debt_ratio, cached after the first run
+    df = load_panel(path)
+    print(f"Loaded '{path.name}'.")
+    required = [ESG, EMPL, ASSETS, DEBT, SECTOR, *OUTCOMES]
     miss = [c for c in required if c not in df.columns]
     if miss: raise ValueError(f"Missing required columns: {miss}")
-    num(df, [YEAR, ESG, EMPL, ASSETS, DEBT, *OUTCOMES])
-    build_debt_ratio(df)
-    df = df.set_index([FIRM, YEAR]).sort_index()
-
-    results = []
-
-    # Full sample
-    for oc in OUTCOMES:
-        for lg in LAGS:
-            results.append(fit_one(df, oc, lg, "Full Period"))
-
-    # COVID vs Non-COVID
-yrs = df.index.get_level_values(1)
-covid = df.loc[(yrs >= 2020) & (yrs <= 2021)]
-non_covid = df.loc[(yrs < 2020) | (yrs >= 2022)]
-
-for label, sub in (("COVID", covid), ("Non-COVID", non_covid)):
-    for y in OUTCOMES:
-        for L in LAGS:
-            results.append(fit_one(sub, y, L, label))
-
-
-    # Hotels Only (Sector contains 'hotel')
-    hotels_mask = df.reset_index().set_index([FIRM, YEAR])[SECTOR].str.contains("hotel", case=False, na=False)
-    hotels = df.loc[hotels_mask]
-    for oc in OUTCOMES:
-        for lg in LAGS:
-            results.append(fit_one(hotels, oc, lg, "Hotels Only"))
-
-    out = pd.DataFrame(results)[
-        ["Subset","Outcome","Lag","N (obs)","R2_within","coef_ESG","p_ESG","status"]
-    ]
+    df = add_lags(df, [ESG], LAGS)
+
+    # COVID vs Non-COVID; a year window cuts each firm's history, so lag within the window
+    yrs = df.index.get_level_values(1)
+    covid = add_lags(df.loc[(yrs >= 2020) & (yrs <= 2021)], [ESG], LAGS)
+    non_covid = add_lags(df.loc[(yrs < 2020) | (yrs >= 2022)], [ESG], LAGS)
+
+    # Hotels Only (Sector contains 'hotel'); lagged within the subset too, so a
+    # firm whose Sector changes does not carry non-hotel years into the lag
+    hotels = add_lags(df.loc[df[SECTOR].str.contains("hotel", case=False, na=False, regex=False)],
+                      [ESG], LAGS)
+
+    subsets = [("Full Period", df), ("COVID", covid),
+               ("Non-COVID", non_covid), ("Hotels Only", hotels)]
+
+    # one float64 matrix per subset; every fit takes its four columns from it
+    cols = [*OUTCOMES, *(lag_name(ESG, lg) for lg in LAGS), EMPL, DEBT_RATIO]
+    pos = {c: i for i, c in enumerate(cols)}
+
+    # the fits are independent: run them in worker processes, sending each
+    # only the columns it uses
+    with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        jobs, futures = [], []
+        for label, sub in subsets:
+            M = np.ascontiguousarray(sub[cols].to_numpy(dtype=np.float64))
+            # integer firm level for PanelOLS; the categorical stays in df
+            index = int_firm_index(sub.index)
+            for oc in OUTCOMES:
+                for lg in LAGS:
+                    take = [pos[oc], pos[lag_name(ESG, lg)], pos[EMPL], pos[DEBT_RATIO]]
+                    jobs.append((label, oc, lg))
+                    futures.append(pool.submit(fit_one, index, M[:, take], oc))
+
+        # fit_one returns plain tuples; scatter them into typed columns
+        n = len(futures)
+        nobs = np.empty(n, dtype=np.int64)
+        stats = np.empty((n, 3), dtype=np.float64)  # R2_within, coef_ESG, p_ESG
+        status = np.empty(n, dtype=object)
+        for i, f in enumerate(futures):
+            nobs[i], r2, coef, p, status[i] = f.result()
+            stats[i] = r2, coef, p
+
+    labels, outcomes, lags = zip(*jobs)
+    out = pd.DataFrame({
+        "Subset": labels, "Outcome": outcomes, "Lag": np.array(lags, dtype=np.int64),
+        "N (obs)": nobs, "R2_within": stats[:, 0],
+        "coef_ESG": stats[:, 1], "p_ESG": stats[:, 2], "status": status,
+    })
     out.to_csv(OUT_PATH, index=False)
     print(f"Saved results to {OUT_PATH}")
 
+if __name__ == "__main__":
+    main()
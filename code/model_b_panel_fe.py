@@ -12,10 +12,18 @@
 # Columns include N, R2_within, and coef/p for E, S, G.
 # ==========================================================
 
+import os
+# one BLAS thread per process, since the fits below already run in parallel
+# worker processes; must run before numpy is imported
+from blas_threads import pin_blas_threads
+pin_blas_threads()
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 import numpy as np
 from linearmodels.panel import PanelOLS
+from data_io import load_panel
+from panel_utils import add_lags, estimable_rows, int_firm_index, lag_name
 
 # ---------- config ----------
 DATA_FILES = [
@@ -36,6 +44,8 @@ SECTOR = "Sector"
 DEBT_RATIO = "Debt_ratio"
 OUTCOMES = ["ROA", "NIAT"]
 LAGS = [0, 1, 2, 3]
+# float columns of the results table, in fit_one's return order
+STAT_COLS = ["R2_within", "coef_E", "p_E", "coef_S", "p_S", "coef_G", "p_G"]
 
 OUT_DIR = Path("outputs")
 OUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -50,53 +60,18 @@ def find_csv() -> Path:
                 return p
     raise FileNotFoundError(f"Data file not found. Looked for: {', '.join(DATA_FILES)}")
 
-def read_csv_robust(p: Path) -> pd.DataFrame:
-    last = None
-    for enc in ("utf-8", "utf-8-sig", "cp1252", "latin-1"):
-        try:
-            df = pd.read_csv(p, encoding=enc, low_memory=False)
-            print(f"Loaded '{p.name}' with encoding '{enc}'.")
-            return df
-        except Exception as e:
-            last = e
-    raise RuntimeError(f"Failed to read CSV. Last error: {last}")
-
-# ---------- prep ----------
-def coerce_numeric(df, cols):
-    for c in cols:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-
-def build_debt_ratio(df):
-    coerce_numeric(df, [DEBT, ASSETS])
-    df[DEBT_RATIO] = df[DEBT] / df[ASSETS]
-    df.replace([np.inf, -np.inf], np.nan, inplace=True)
-
-def drop_singletons(frame: pd.DataFrame) -> pd.DataFrame:
-    ent = frame.index.get_level_values(0)
-    keep = ent.value_counts()
-    keep = keep[keep >= 2].index
-    return frame.loc[ent.isin(keep)]
-
 # ---------- estimation ----------
-def fit_one(block, outcome, lag, label):
-    # build regressors with common lag L on E,S,G within firm
-    X = block[[E, S, G, EMPL, DEBT_RATIO]].copy()
-    if lag:
-        for c in (E, S, G):
-            X[c] = X.groupby(level=0)[c].shift(lag)
-
-    data = pd.concat([block[outcome], X], axis=1).dropna()
-    data = drop_singletons(data)
-
-    if data.empty or data.index.get_level_values(0).value_counts().min() < 2:
-        return {
-            "Subset": label, "Outcome": outcome, "Lag": lag,
-            "N (obs)": 0, "R2_within": np.nan,
-            "coef_E": np.nan, "p_E": np.nan,
-            "coef_S": np.nan, "p_S": np.nan,
-            "coef_G": np.nan, "p_G": np.nan,
-            "status": "no_estimable_panel",
-        }
+def fit_one(index, values, outcome):
+    # returns (N, R2_within, coef_E, p_E, coef_S, p_S, coef_G, p_G, status)
+    # values: float64 columns [outcome, E, S, G at lag L, EMPL, DEBT_RATIO]
+    # taken from the subset matrix built in main(); keep complete rows of
+    # firms that still have at least two of them
+    keep = estimable_rows(index, values)
+    data = pd.DataFrame(values[keep], index=index[keep],
+                        columns=[outcome, E, S, G, EMPL, DEBT_RATIO])
+
+    if data.empty:
+        return (0, *([np.nan] * len(STAT_COLS)), "no_estimable_panel")
 
     mod = PanelOLS(
         dependent=data[outcome],
@@ -105,64 +80,85 @@ def fit_one(block, outcome, lag, label):
         time_effects=True,
     )
 
-    # firm clusters aligned to the model index
-    clusters = pd.Series(data.index.get_level_values(0), index=data.index, name="entity")
+    # firm clusters aligned to the model index, as the integer firm codes
+    clusters = pd.Series(data.index.codes[0], index=data.index, name="entity")
     res = mod.fit(cov_type="clustered", clusters=clusters)
 
-    return {
-        "Subset": label, "Outcome": outcome, "Lag": lag,
-        "N (obs)": int(res.nobs),
-        "R2_within": float(res.rsquared_within),
-        "coef_E": float(res.params.get(E, np.nan)),
-        "p_E": float(res.pvalues.get(E, np.nan)),
-        "coef_S": float(res.params.get(S, np.nan)),
-        "p_S": float(res.pvalues.get(S, np.nan)),
-        "coef_G": float(res.params.get(G, np.nan)),
-        "p_G": float(res.pvalues.get(G, np.nan)),
-        "status": "ok",
-    }
+    return (
+        int(res.nobs),
+        float(res.rsquared_within),
+        float(res.params.get(E, np.nan)), float(res.pvalues.get(E, np.nan)),
+        float(res.params.get(S, np.nan)), float(res.pvalues.get(S, np.nan)),
+        float(res.params.get(G, np.nan)), float(res.pvalues.get(G, np.nan)),
+        "ok",
+    )
 
 # ---------- main ----------
-if __name__ == "__main__":
+def main():
     path = find_csv()
-    df = read_csv_robust(path)
+    # numeric-coerced panel with Debt_ratio, indexed by (firm, year);
+    # cached as Parquet after the first run
+    df = load_panel(path)
+    print(f"Loaded '{path.name}'.")
 
-    required = [FIRM, YEAR, E, S, G, EMPL, ASSETS, DEBT, SECTOR, *OUTCOMES]
+    required = [E, S, G, EMPL, ASSETS, DEBT, SECTOR, *OUTCOMES]
     missing = [c for c in required if c not in df.columns]
     if missing:
         raise ValueError(f"Missing required columns: {missing}")
 
-    coerce_numeric(df, [YEAR, E, S, G, EMPL, ASSETS, DEBT, *OUTCOMES])
-    build_debt_ratio(df)
-
-    # set two-way index
-    df = df.set_index([FIRM, YEAR]).sort_index()
-
-    results = []
-
     # Subsets: define once, loop once
-yrs = df.index.get_level_values(1)
-covid = df.loc[(yrs >= 2020) & (yrs <= 2021)]
-non_covid = df.loc[(yrs < 2020) | (yrs >= 2022)]
-hotels = df[df[SECTOR].astype(str).str.contains("hotel", case=False, na=False)]
-
-subsets = [
-    ("Full Period", df),
-    ("COVID", covid),
-    ("Non-COVID", non_covid),
-    ("Hotels Only", hotels),
-]
-
-for label, sub in subsets:
-    for y in OUTCOMES:
-        for L in LAGS:
-            results.append(fit_one(sub, y, L, label))
-
-
-    out = pd.DataFrame(results)[
-        ["Subset","Outcome","Lag","N (obs)","R2_within",
-         "coef_E","p_E","coef_S","p_S","coef_G","p_G","status"]
+    yrs = df.index.get_level_values(1)
+    covid = df.loc[(yrs >= 2020) & (yrs <= 2021)]
+    non_covid = df.loc[(yrs < 2020) | (yrs >= 2022)]
+    hotels = df[df[SECTOR].str.contains("hotel", case=False, na=False, regex=False)]
+
+    subsets = [
+        ("Full Period", df),
+        ("COVID", covid),
+        ("Non-COVID", non_covid),
+        ("Hotels Only", hotels),
     ]
+
+    # one float64 matrix per subset holding every column any fit needs
+    cols = [*OUTCOMES, *(lag_name(c, L) for L in LAGS for c in (E, S, G)), EMPL, DEBT_RATIO]
+    pos = {c: i for i, c in enumerate(cols)}
+
+    # the 32 fits are independent: run them in worker processes, sending
+    # each only the columns it uses
+    with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        jobs, futures = [], []
+        for label, sub in subsets:
+            # within-firm lags of E,S,G, taken inside the subset (year windows
+            # cut each firm's history)
+            sub = add_lags(sub, [E, S, G], LAGS)
+            M = np.ascontiguousarray(sub[cols].to_numpy(dtype=np.float64))
+            # integer firm level for PanelOLS; the categorical stays in df
+            index = int_firm_index(sub.index)
+            for y in OUTCOMES:
+                for L in LAGS:
+                    fit_cols = [y, *(lag_name(c, L) for c in (E, S, G)), EMPL, DEBT_RATIO]
+                    take = [pos[c] for c in fit_cols]
+                    jobs.append((label, y, L))
+                    futures.append(pool.submit(fit_one, index, M[:, take], y))
+
+        # fit_one returns plain tuples; scatter them into typed columns
+        n = len(futures)
+        nobs = np.empty(n, dtype=np.int64)
+        stats = np.empty((n, len(STAT_COLS)), dtype=np.float64)
+        status = np.empty(n, dtype=object)
+        for i, f in enumerate(futures):
+            row = f.result()
+            nobs[i], stats[i], status[i] = row[0], row[1:-1], row[-1]
+
+    labels, outcomes, lags = zip(*jobs)
+    out = pd.DataFrame({
+        "Subset": labels, "Outcome": outcomes, "Lag": np.array(lags, dtype=np.int64),
+        "N (obs)": nobs,
+        **{c: stats[:, j] for j, c in enumerate(STAT_COLS)},
+        "status": status,
+    })
     out.to_csv(OUT_PATH, index=False)
     print(f"Saved results to {OUT_PATH}")
 
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,8 @@ import pandas as pd
 import statsmodels.api as sm
 from scipy import stats
 from linearmodels.panel import PanelOLS
+from data_io import load_panel
+from panel_utils import int_firm_index, level_nunique
 
 
 # ---------- 1) Load data ----------
@@ -25,26 +27,48 @@ DATA_PATH = os.path.expanduser(
     "~/thesis_models/data/Final Data Including Controls.csv"
 )
 
-def read_csv_robust(path: str) -> pd.DataFrame:
-    try:
-        return pd.read_csv(path)
-    except UnicodeDecodeError:
-        return pd.read_csv(path, encoding="ISO-8859-1")
-
-df = read_csv_robust(DATA_PATH)
+# typed panel indexed by (Company_Code, Year), shared with the model scripts
+df = load_panel(DATA_PATH)
 
 # required columns
 ID_COL, TIME_COL = "Company_Code", "Year"
 PREDICTORS = ["ESG_Score", "Employees", "Debt", "Assets"]
 DEPENDENTS = ["ROA", "NIAT"]
 
-required = set([ID_COL, TIME_COL] + PREDICTORS + DEPENDENTS)
+required = set(PREDICTORS + DEPENDENTS)
 missing = [c for c in required if c not in df.columns]
 if missing:
     raise ValueError(f"Missing required columns: {missing}")
 
-# panel index
-df = df.set_index([ID_COL, TIME_COL]).sort_index()
+def pairwise_corr(X: np.ndarray) -> np.ndarray:
+    """Column correlations over pairwise-complete rows, as DataFrame.corr() gives."""
+    # per pair (i, j) from matrix products: overlap count, sums of x_i and
+    # x_i**2 over the overlap, and the cross-product sum
+    W = (~np.isnan(X)).astype(np.float64)
+    Xz = np.where(W > 0, X, 0.0)
+    n = W.T @ W
+    S = Xz.T @ W                 # S[i, j] = sum of x_i where x_i and x_j are both present
+    Q = (Xz * Xz).T @ W
+    P = Xz.T @ Xz
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = P - S * S.T / n
+        var = Q - S * S / n      # var[i, j]: spread of x_i on the (i, j) overlap
+        R = cov / np.sqrt(var * var.T)
+    R[(n < 2) | (var <= 0) | (var.T <= 0)] = np.nan
+    return R
+
+def firm_variances(e: pd.Series) -> np.ndarray:
+    """Per-firm sample variance (ddof=1, NaN for one obs) of a firm-sorted series."""
+    v = e.to_numpy(dtype=np.float64)
+    if v.size == 0:
+        return v
+    codes = e.index.codes[0]
+    # each firm is one contiguous run: sums over runs, then centred squares
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    n = np.diff(np.r_[starts, v.size])
+    dev = v - np.repeat(np.add.reduceat(v, starts) / n, n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.add.reduceat(dev * dev, starts) / (n - 1)
 
 def add_const(X: pd.DataFrame) -> pd.DataFrame:
     return sm.add_constant(X, has_constant="add")
@@ -55,7 +79,11 @@ rows = []
 
 for dep in DEPENDENTS:
     used = PREDICTORS + [dep]
-    d = df[used].dropna()
+    # complete cases via one numpy NaN mask; a frame is built only for PanelOLS
+    vals = df[used].to_numpy(dtype=np.float64)
+    ok = ~np.isnan(vals).any(axis=1)
+    # integer firm level: PanelOLS gets no categorical key to group on
+    d = pd.DataFrame(vals[ok], index=int_firm_index(df.index)[ok], columns=used)
 
     y = d[dep]
     X = add_const(d[PREDICTORS])
@@ -75,10 +103,15 @@ for dep in DEPENDENTS:
     e = res.resids.dropna().sort_index()
 
     # ---- Wooldridge AR(1) (pooled) ---------------------------------------
-    e_lag = e.groupby(level=0).shift(1)
+    e_lag = e.groupby(level=0, sort=False, observed=True).shift(1)
     mask = e.notna() & e_lag.notna()
     if mask.any():
-        rho, _ = stats.pearsonr(e[mask], e_lag[mask])
+        # Pearson rho from two centred dot products (pearsonr's t-test is unused)
+        a = e[mask].to_numpy(dtype=np.float64)
+        b = e_lag[mask].to_numpy(dtype=np.float64)
+        a -= a.mean()
+        b -= b.mean()
+        rho = (a @ b) / np.sqrt((a @ a) * (b @ b))
         n_eff = int(mask.sum())
         wool_stat = n_eff * (rho ** 2)
         wool_pval = 1 - stats.chi2.cdf(wool_stat, 1)
@@ -93,10 +126,10 @@ for dep in DEPENDENTS:
         # de-mean by entity and time
         M = M - M.mean(axis=0)
         M = M.sub(M.mean(axis=1), axis=0)
-        R = M.corr()
+        R = pairwise_corr(M.to_numpy(dtype=np.float64))
         N = R.shape[0]
         iu = np.triu_indices(N, k=1)
-        rbar = np.nanmean(R.values[iu])
+        rbar = np.nanmean(R[iu])
         T = M.shape[0]
         cd_stat = np.sqrt(T) * rbar * np.sqrt(N * (N - 1) / 2.0)
         cd_pval = 2 * (1 - stats.norm.cdf(abs(cd_stat)))
@@ -104,9 +137,10 @@ for dep in DEPENDENTS:
         cd_stat, cd_pval = np.nan, np.nan
 
     # ---- Groupwise heteroskedasticity proxy ------------------------------
-    gv = e.groupby(level=0).var()
-    if gv.size >= 3 and gv.mean() > 0:
-        wald_stat = (gv.var() / (gv.mean() ** 2)) * gv.size
+    gv = firm_variances(e)
+    gv_ok = gv[~np.isnan(gv)]  # firms with one residual have no variance
+    if gv.size >= 3 and gv_ok.size and gv_ok.mean() > 0:
+        wald_stat = (gv_ok.var(ddof=1) / (gv_ok.mean() ** 2)) * gv.size
         wald_pval = 1 - stats.chi2.cdf(wald_stat, 1)
     else:
         wald_stat, wald_pval = np.nan, np.nan
@@ -115,8 +149,8 @@ for dep in DEPENDENTS:
         "Dependent_Var": dep,
         "Model": "FE (entity + time)",
         "Obs_used": int(d.shape[0]),
-        "Entities": int(d.index.get_level_values(0).nunique()),
-        "Years": int(d.index.get_level_values(1).nunique()),
+        "Entities": level_nunique(d.index, 0),
+        "Years": level_nunique(d.index, 1),
         "R2_within": r2_w,
         "R2_between": r2_b,
         "R2_overall": r2_o,
@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 import argparse, pathlib, sys
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # files only, no GUI backend
 import matplotlib.pyplot as plt
+from data_io import load_cached, save_png
 
 def human_usd(x): return f"{x:,.0f}"
 
+def bar_hist(counts, edges):
+    # draws precomputed counts the way plt.hist draws a single series
+    plt.bar(edges[:-1], counts, width=np.diff(edges), align="edge")
+
 def load_table(path):
     p = pathlib.Path(path)
     suffix = p.suffix.lower()
@@ -15,14 +23,8 @@ def load_table(path):
         except Exception as e:
             print("Need Excel support. Installing:", e, file=sys.stderr)
             raise
-    # CSV with robust encodings
-    for enc in ("utf-8", "cp1252", "latin-1", "utf-16", "utf-16le", "utf-16be"):
-        try:
-            return pd.read_csv(p, encoding=enc)
-        except UnicodeDecodeError:
-            continue
-    # last resort
-    return pd.read_csv(p, engine="python", encoding_errors="ignore")
+    # CSV: shared loader (sniffed encoding, Parquet cache)
+    return load_cached(p)
 
 p = argparse.ArgumentParser()
 p.add_argument("--data", required=True)
@@ -52,35 +54,39 @@ print("NIAT median USD:", human_usd(median_))
 # Histograms (linear, symlog, trimmed)
 sv = s.dropna()
 
+# bin once at 300 equal-width bins over [min, max]; summing adjacent
+# triples / pairs gives exactly the 100- and 150-bin histograms
+counts300, edges300 = np.histogram(sv.to_numpy(), bins=300)
+
 # 1) Linear (current Figure 2)
 plt.figure()
-plt.hist(sv, bins=100)
+bar_hist(counts300.reshape(100, 3).sum(axis=1), edges300[::3])
 plt.axvline(mean_, linestyle="--", linewidth=2, label=f"Mean: ${human_usd(mean_)}")
 plt.axvline(median_, linestyle="-.", linewidth=2, label=f"Median: ${human_usd(median_)}")
 plt.title("Distribution of Net Income After Taxes (NIAT)")
 plt.xlabel("NIAT (USD)"); plt.ylabel("Frequency"); plt.legend()
-plt.tight_layout(); plt.savefig(outdir / "figure_2_niat_histogram.png", dpi=300); plt.close()
+plt.tight_layout(); save_png(plt.gcf(), outdir / "figure_2_niat_histogram.png"); plt.close()
 
 # 2) Symmetric log x-axis (recommended replacement for Figure 2)
 plt.figure()
-plt.hist(sv, bins=150)
+bar_hist(counts300.reshape(150, 2).sum(axis=1), edges300[::2])
 plt.axvline(mean_, linestyle="--", linewidth=2, label=f"Mean: ${human_usd(mean_)}")
 plt.axvline(median_, linestyle="-.", linewidth=2, label=f"Median: ${human_usd(median_)}")
 plt.xscale("symlog", linthresh=1e6)  # linear within ±$1m
 plt.title("Distribution of NIAT (symlog x-axis)")
 plt.xlabel("NIAT (USD, symmetric log scale)"); plt.ylabel("Frequency"); plt.legend()
-plt.tight_layout(); plt.savefig(outdir / "figure_2_niat_histogram_symlog.png", dpi=300); plt.close()
+plt.tight_layout(); save_png(plt.gcf(), outdir / "figure_2_niat_histogram_symlog.png"); plt.close()
 
 # 3) Percentile-trimmed (1st–99th) for readability (appendix)
 lo, hi = sv.quantile([0.01, 0.99])
 sv_trim = sv[(sv >= lo) & (sv <= hi)]
 plt.figure()
-plt.hist(sv_trim, bins=120)
+bar_hist(*np.histogram(sv_trim.to_numpy(), bins=120))
 plt.axvline(sv_trim.mean(), linestyle="--", linewidth=2, label=f"Trimmed mean: ${human_usd(sv_trim.mean())}")
 plt.axvline(sv_trim.median(), linestyle="-.", linewidth=2, label=f"Trimmed median: ${human_usd(sv_trim.median())}")
 plt.title("Distribution of NIAT (1st–99th percentiles)")
 plt.xlabel("NIAT (USD)"); plt.ylabel("Frequency"); plt.legend()
-plt.tight_layout(); plt.savefig(outdir / "figure_2_niat_histogram_p01_p99.png", dpi=300); plt.close()
+plt.tight_layout(); save_png(plt.gcf(), outdir / "figure_2_niat_histogram_p01_p99.png"); plt.close()
 
 
 # Box-plots by year
@@ -96,7 +102,7 @@ if a.year_col in df.columns:
         plt.title("Box Plot of NIAT by Year")
         plt.xlabel("Year"); plt.ylabel("NIAT (USD)")
         plt.xticks(rotation=45)
-        plt.tight_layout(); plt.savefig(outdir / "figure_3_niat_boxplot_by_year.png", dpi=300); plt.close()
+        plt.tight_layout(); save_png(plt.gcf(), outdir / "figure_3_niat_boxplot_by_year.png"); plt.close()
 
 # Descriptives CSV
 desc = pd.DataFrame({"N":[n_niat],"Mean_USD":[mean_],"Median_USD":[median_],
@@ -108,4 +114,5 @@ corr_vars = [c for c in a.corr_vars if c in df.columns]
 if corr_vars:
     df[corr_vars].apply(pd.to_numeric, errors="coerce").corr().to_csv(outdir / "table_correlation_matrix.csv")
 
+plt.close("all")
 print("Saved figures and tables to:", outdir)
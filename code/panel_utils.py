@@ -0,0 +1,61 @@
+# code/panel_utils.py
+# Within-firm lags for panels sorted by (firm, year).
+# With every firm's rows contiguous, a lag is a plain array offset that is
+# kept only where the earlier row belongs to the same firm, so all lags
+# come from a few vectorised numpy passes instead of one groupby per lag.
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+def firm_codes(index: pd.Index | pd.MultiIndex) -> np.ndarray:
+    firms = index.get_level_values(0) if isinstance(index, pd.MultiIndex) else index
+    codes, _ = pd.factorize(firms, sort=False)
+    return codes
+
+def multi_shift(values, codes: np.ndarray, lags) -> dict[int, np.ndarray]:
+    """Same result as groupby(firm).shift(lag) for each lag, given rows sorted by firm."""
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.asarray(codes)
+    out = {}
+    for lag in lags:
+        shifted = np.full(values.shape, np.nan)
+        if lag == 0:
+            shifted[:] = values
+        elif lag < values.size:
+            same_firm = codes[lag:] == codes[:-lag]
+            shifted[lag:] = np.where(same_firm, values[:-lag], np.nan)
+        out[lag] = shifted
+    return out
+
+def lag_name(col: str, lag: int) -> str:
+    return col if lag == 0 else f"{col}_lag{lag}"
+
+def add_lags(frame: pd.DataFrame, cols, lags) -> pd.DataFrame:
+    """Copy of `frame` with a within-firm `<col>_lag<L>` column per col and lag > 0."""
+    codes = firm_codes(frame.index)
+    new = {}
+    for c in cols:
+        for lag, shifted in multi_shift(frame[c], codes, [L for L in lags if L]).items():
+            new[lag_name(c, lag)] = shifted
+    return frame.assign(**new)
+
+def estimable_rows(index: pd.MultiIndex, values: np.ndarray) -> np.ndarray:
+    """Rows with no NaN in `values` whose firm has at least two such rows."""
+    codes = index.codes[0]
+    # complete-case mask and per-firm counts in one sweep; code -1 is a missing firm
+    ok = (codes >= 0) & ~np.isnan(values).any(axis=1)
+    cnt = np.bincount(codes[ok], minlength=len(index.levels[0]))
+    return ok & (cnt[codes] >= 2)
+
+def level_nunique(index: pd.MultiIndex, level: int = 0) -> int:
+    """index.get_level_values(level).nunique(), counted on the level's integer codes."""
+    codes = index.codes[level]
+    return int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+
+def int_firm_index(index: pd.MultiIndex) -> pd.MultiIndex:
+    """`index` with the (categorical) firm level swapped for its integer codes."""
+    # same codes, plain int64 level: linearmodels' internal groupbys then do
+    # not run on a categorical key (observed= FutureWarnings)
+    return pd.MultiIndex(levels=[np.arange(len(index.levels[0])), *index.levels[1:]],
+                         codes=index.codes, names=index.names, verify_integrity=False)
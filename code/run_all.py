@@ -0,0 +1,43 @@
+# code/run_all.py
+# Runs the descriptive scripts, the controls-only FE models and the Hausman
+# appendix in one Python process, so pandas/matplotlib/linearmodels are
+# imported once instead of once per script.
+# Usage:
+#   python3 code/run_all.py
+#   python3 code/run_all.py "/path/to/Final Data Including Controls.csv"
+
+from __future__ import annotations
+from pathlib import Path
+import sys
+# before the imports below load numpy, so the Hausman worker pool stays at one
+# BLAS thread per process when run from here too
+from blas_threads import pin_blas_threads
+pin_blas_threads()
+from data_io import project_paths
+
+import controls_descriptives
+import controls_summary
+import correlation_matrix
+import depvar_distribution
+import describe_esg
+import describe_pillars
+import hausman_appendix_A1
+
+def main():
+    # the descriptive scripts pick up the same optional CSV argument from sys.argv
+    csv_path = Path(sys.argv[1]) if len(sys.argv) > 1 else project_paths()["csv"]
+    steps = [
+        ("describe_esg", describe_esg.main),
+        ("describe_pillars", describe_pillars.main),
+        ("controls_descriptives", controls_descriptives.main),
+        ("depvar_distribution", lambda: depvar_distribution.main(["--data", str(csv_path)])),
+        ("correlation_matrix", correlation_matrix.main),
+        ("hausman_appendix_A1", lambda: hausman_appendix_A1.main(csv_path)),
+        ("controls_summary", lambda: controls_summary.main(csv_path)),
+    ]
+    for name, run in steps:
+        print(f"==> Running {name}")
+        run()
+
+if __name__ == "__main__":
+    main()
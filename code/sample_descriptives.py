@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
+import warnings
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from data_io import load_panel
 
 DATA = Path("data/Final Data Including Controls.csv")
 OUT  = Path("outputs")
 OUT.mkdir(parents=True, exist_ok=True)
 
-df = pd.read_csv(DATA, encoding="ISO-8859-1")
+df = load_panel(DATA).reset_index()
 
 # --- column detection ---
 firm_col = "Company_Code" if "Company_Code" in df.columns else ("Company" if "Company" in df.columns else None)
@@ -21,7 +23,7 @@ if firm_col is None or year_col not in df.columns:
 def is_hotels(x):
     if sector_col is None:
         return pd.Series(False, index=x.index)
-    return x[sector_col].astype(str).str.contains("hotel", case=False, na=False)
+    return x[sector_col].astype(str).str.contains("hotel", case=False, na=False, regex=False)
 
 df["panel"] = "Full sample"
 df.loc[is_hotels(df), "panel"] = "Hotels only"
@@ -51,7 +53,7 @@ pd.DataFrame(rows).to_csv(OUT/"sample_overview.csv", index=False)
 # --- sector breakdown (optional, if Sector exists) ---
 if sector_col:
     b = (df
-         .groupby(sector_col, dropna=False)
+         .groupby(sector_col, dropna=False, sort=False, observed=True)
          .agg(entities=(firm_col, "nunique"),
               obs=("Year","size"))
          .sort_values("obs", ascending=False)
@@ -64,14 +66,24 @@ if not vars_keep:
     raise ValueError("None of ESG_Score, ROA, NIAT, Employees, Debt found in data.")
 
 def desc_table(sub):
+    # each reduction runs over all variables at once; all-NaN or single-value
+    # columns give NaN as pandas would (numpy's warnings for those are muted)
+    arr = sub[vars_keep].to_numpy(dtype="float64")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        cnt = np.count_nonzero(~np.isnan(arr), axis=0)
+        mu = np.nanmean(arr, axis=0)
+        sd = np.nanstd(arr, axis=0, ddof=1)
+        # nanmin/nanmax reject zero-row input (e.g. no hotel rows)
+        mn = np.nanmin(arr, axis=0) if len(arr) else np.full(len(vars_keep), np.nan)
+        mx = np.nanmax(arr, axis=0) if len(arr) else np.full(len(vars_keep), np.nan)
     stats = {}
-    for v in vars_keep:
-        s = sub[v].astype("float64")
-        stats[v+"_count"] = s.count()
-        stats[v+"_mean"]  = s.mean()
-        stats[v+"_sd"]    = s.std(ddof=1)
-        stats[v+"_min"]   = s.min()
-        stats[v+"_max"]   = s.max()
+    for i, v in enumerate(vars_keep):
+        stats[v+"_count"] = int(cnt[i])
+        stats[v+"_mean"]  = mu[i]
+        stats[v+"_sd"]    = sd[i]
+        stats[v+"_min"]   = mn[i]
+        stats[v+"_max"]   = mx[i]
     return pd.Series(stats)
 
 tables = {
@@ -0,0 +1,33 @@
+# code/summary_stats.py
+# Descriptive statistics shared by the descriptive scripts.
+# One DataFrame.describe call covers every column instead of seven
+# separate reductions per column.
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+DESC_COLS = ["n", "mean", "std", "min", "q1", "median", "q3", "max"]
+
+def describe_frame(df: pd.DataFrame, cols: list[str], total: int | None = None) -> pd.DataFrame:
+    desc = (
+        df[cols]
+        .describe(percentiles=[0.25, 0.5, 0.75])
+        .T
+        .rename(columns={"count": "n", "25%": "q1", "50%": "median", "75%": "q3"})
+        [DESC_COLS]
+    )
+    desc["n"] = desc["n"].astype(int)
+    if total is not None:
+        desc.insert(1, "coverage_pct", desc["n"] / total * 100.0)
+    return desc.rename_axis("variable").reset_index()
+
+def availability(df: pd.DataFrame, cols: list[str], total: int) -> pd.DataFrame:
+    arr = df[cols].to_numpy(dtype=np.float64)
+    nn = np.count_nonzero(~np.isnan(arr), axis=0)
+    return pd.DataFrame({
+        "variable": cols,
+        "non_null": nn,
+        "missing": total - nn,
+        "pct_available": nn / total * 100.0,
+    })
@@ -6,8 +6,10 @@ Writes: outputs/vif_summary.csv
 
 from pathlib import Path
 import re
+import numpy as np
 import pandas as pd
 from statsmodels.stats.outliers_influence import variance_inflation_factor
+from data_io import load_panel
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA = ROOT / "data" / "Final Data Including Controls.csv"
@@ -27,15 +29,20 @@ def find_col(df: pd.DataFrame, candidates):
     raise KeyError(f"Missing any of {candidates}. Columns: {list(df.columns)}")
 
 def hotel_mask(series: pd.Series):
-    return series.astype(str).str.contains(r"\bhotel(s)?\b", case=False, na=False)
+    # plain substring, as in the model and descriptives scripts
+    return series.astype(str).str.contains("hotel", case=False, na=False, regex=False)
 
 def vif_table(X: pd.DataFrame) -> pd.DataFrame:
-    X = X.dropna().copy()
-    arr = X.to_numpy()
-    rows = []
-    for i, name in enumerate(X.columns):
-        rows.append((name, float(variance_inflation_factor(arr, i))))
-    return pd.DataFrame(rows, columns=["variable", "vif"])
+    X = X.dropna()
+    arr = X.to_numpy(dtype=np.float64)
+    # variance_inflation_factor regresses each column on the others without
+    # a constant, i.e. VIF_i = x_i'x_i * [(X'X)^-1]_ii: one k x k inverse
+    gram = arr.T @ arr
+    try:
+        vifs = np.diag(gram) * np.diag(np.linalg.inv(gram))
+    except np.linalg.LinAlgError:
+        vifs = [variance_inflation_factor(arr, i) for i in range(arr.shape[1])]
+    return pd.DataFrame({"variable": X.columns, "vif": np.asarray(vifs, dtype=np.float64)})
 
 def compute_block(df, sample, lag, spec, cols):
     tab = vif_table(df[cols])
@@ -46,19 +53,9 @@ def compute_block(df, sample, lag, spec, cols):
     tab["max_vif"]  = tab["vif"].max()
     return tab
 
-def load_csv(path: Path) -> pd.DataFrame:
-    # Try UTF-8, then Windows-1252 (cp1252), then Latin-1.
-    for enc in ("utf-8", "cp1252", "latin1"):
-        try:
-            return pd.read_csv(path, encoding=enc, engine="python")
-        except UnicodeDecodeError:
-            continue
-    # Last resort: replace bad bytes to avoid crash.
-    return pd.read_csv(path, encoding="utf-8", engine="python", encoding_errors="replace")
-
 # ---------- main
 
-df = load_csv(DATA)
+df = load_panel(DATA).reset_index()
 
 # column detection
 firm   = find_col(df, ["Company", "Firm", "Organisation", "Org", "Ticker"])
@@ -82,25 +79,25 @@ for cand in ["Environmental","E","Social","S","Governance","G","Env","Soc","Gov"
         pass
 has_pillars = seen >= {"E","S","G"}
 
-df = df.sort_values([firm, year]).copy()
+df = df.sort_values([firm, year])
 
 out = []
-for sample_name, dsub in [("full", df), ("hotels", df[hotel_mask(df[sector])].copy())]:
-    for lag in range(4):  # 0..3
-        d = dsub.copy()
-        d[f"{esg}_lag"] = d.groupby(firm)[esg].shift(lag)
+lag_src = list(dict.fromkeys([esg, *pillars])) if has_pillars else [esg]
+for sample_name, dsub in [("full", df), ("hotels", df[hotel_mask(df[sector])])]:
+    # all lags of every lagged column from one groupby, before the loop;
+    # each block below selects its columns instead of copying the sample
+    g = dsub.groupby(firm, sort=False, observed=True)
+    shifted = {lag: g[lag_src].shift(lag).add_suffix("_lag") for lag in range(4)}  # 0..3
+    controls = dsub[[emp, debt]]
+    for lag in range(4):
         esg_cols = [f"{esg}_lag", emp, debt]
-        tmp = d.dropna(subset=esg_cols)
+        tmp = shifted[lag][[f"{esg}_lag"]].join(controls).dropna()
         if len(tmp):
             out.append(compute_block(tmp, sample_name, lag, "ESG", esg_cols))
         if has_pillars:
-            dd = dsub.copy()
-            lag_cols = []
-            for p in pillars:
-                dd[f"{p}_lag"] = dd.groupby(firm)[p].shift(lag)
-                lag_cols.append(f"{p}_lag")
+            lag_cols = [f"{p}_lag" for p in pillars]
             pill_cols = lag_cols + [emp, debt]
-            tmp2 = dd.dropna(subset=pill_cols)
+            tmp2 = shifted[lag][lag_cols].join(controls).dropna()
             if len(tmp2):
                 out.append(compute_block(tmp2, sample_name, lag, "Pillars", pill_cols))
 